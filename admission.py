@@ -0,0 +1,172 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict
+
+MAX_CONCURRENT_SEARCHES = int(os.getenv('MAX_CONCURRENT_SEARCHES', '4'))
+MAX_QUEUED_SEARCHES = int(os.getenv('MAX_QUEUED_SEARCHES', '8'))
+MAX_SEARCHES_PER_CLIENT = int(os.getenv('MAX_SEARCHES_PER_CLIENT', '2'))
+SEARCH_LATENCY_SLO = float(os.getenv('SEARCH_LATENCY_SLO', '20'))
+# Service time assumed until real searches have been measured
+INITIAL_SERVICE_TIME = 10.0
+SERVICE_TIME_DECAY = 0.8
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, client: str):
+        self.client = client
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """Bounded concurrency with a short, per-client fair wait queue
+
+    At most max_concurrent requests run at once. Others wait in a queue served
+    round-robin across clients, and no client may hold more than per_client
+    running or queued slots. A request is rejected up front when the queue is
+    full or its predicted wait would blow the latency SLO, so a burst sheds
+    load early instead of slowing every request down together.
+
+    State lives in process memory, so every limit applies per worker: with N
+    gunicorn workers up to N * max_concurrent requests run at once.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_SEARCHES, max_queue: int = MAX_QUEUED_SEARCHES,
+                 per_client: int = MAX_SEARCHES_PER_CLIENT, latency_slo: float = SEARCH_LATENCY_SLO):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.per_client = per_client
+        self.latency_slo = latency_slo
+        self.service_time = INITIAL_SERVICE_TIME
+        self.active = 0
+        self.active_per_client: Dict[str, int] = {}
+        # client -> queued waiters; the order of clients is the round-robin order
+        self.waiting: 'OrderedDict[str, deque]' = OrderedDict()
+        self.queue_depth = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def predicted_wait(self) -> float:
+        """Expected queueing delay for a request arriving now"""
+        if self.active < self.max_concurrent and self.queue_depth == 0:
+            return 0.0
+        # Requests ahead of us drain max_concurrent at a time
+        batches_ahead = (self.queue_depth + 1) / max(self.max_concurrent, 1)
+        return batches_ahead * self.service_time
+
+    def _shed(self, reason: str, retry_after: float):
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        raise Overloaded(reason, max(1, math.ceil(retry_after)))
+
+    def _client_load(self, client: str) -> int:
+        return self.active_per_client.get(client, 0) + len(self.waiting.get(client, ()))
+
+    def _grant(self, client: str):
+        self.active += 1
+        self.active_per_client[client] = self.active_per_client.get(client, 0) + 1
+        self.admitted += 1
+
+    def _dispatch(self):
+        """Hand free slots to waiting clients in round-robin order"""
+        while self.active < self.max_concurrent and self.waiting:
+            client, queue = next(iter(self.waiting.items()))
+            waiter = queue.popleft()
+            self.queue_depth -= 1
+            del self.waiting[client]
+            if queue:
+                # Back of the line so other clients get the next slot
+                self.waiting[client] = queue
+            waiter.granted = True
+            self._grant(client)
+            waiter.event.set()
+
+    def acquire(self, client: str):
+        with self._lock:
+            if self._client_load(client) >= self.per_client:
+                self._shed('client_limit', self.service_time)
+            if self.active < self.max_concurrent and self.queue_depth == 0:
+                self._grant(client)
+                return
+            if self.queue_depth >= self.max_queue:
+                self._shed('queue_full', self.predicted_wait())
+            wait = self.predicted_wait()
+            if wait > self.latency_slo:
+                self._shed('slo', wait)
+            waiter = _Waiter(client)
+            self.waiting.setdefault(client, deque()).append(waiter)
+            self.queue_depth += 1
+
+        waiter.event.wait(self.latency_slo)
+
+        with self._lock:
+            if waiter.granted:
+                return
+            # Timed out in the queue - give up our place
+            queue = self.waiting.get(client)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                self.queue_depth -= 1
+                if not queue:
+                    del self.waiting[client]
+            self._shed('timeout', self.predicted_wait())
+
+    def release(self, client: str, elapsed: float):
+        with self._lock:
+            self.active -= 1
+            self.active_per_client[client] -= 1
+            if not self.active_per_client[client]:
+                del self.active_per_client[client]
+            self.service_time = self.service_time * SERVICE_TIME_DECAY + elapsed * (1 - SERVICE_TIME_DECAY)
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, client: str):
+        """Hold a slot for the duration of the block, raising Overloaded if shed"""
+        self.acquire(client)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(client, time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                # Limits and counters cover only this worker process
+                'pid': os.getpid(),
+                'active': self.active,
+                'queue_depth': self.queue_depth,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'per_client': self.per_client,
+                'latency_slo': self.latency_slo,
+                'service_time': round(self.service_time, 3),
+                'predicted_wait': round(self.predicted_wait(), 3),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+                'shed_total': sum(self.shed.values())
+            }
+
+
+search_admission = AdmissionController()
+# Previews are cheap single-page scrapes, but the UI fires several per page of results
+preview_admission = AdmissionController(
+    max_concurrent=int(os.getenv('MAX_CONCURRENT_PREVIEWS', '8')),
+    max_queue=int(os.getenv('MAX_QUEUED_PREVIEWS', '16')),
+    per_client=int(os.getenv('MAX_PREVIEWS_PER_CLIENT', '6')),
+    latency_slo=float(os.getenv('PREVIEW_LATENCY_SLO', '10'))
+)
@@ -1,8 +1,13 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import asyncio
+import hmac
 import os
-from article_scraper import ArticleScraper
+from article_scraper import ArticleScraper, ContentScraper
+import profiling
+from admission import search_admission, preview_admission, Overloaded
+from shared_cache import shared_cache
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -10,6 +15,14 @@ load_dotenv()  # Load environment variables from .env file
 app = Flask(__name__)
 CORS(app)
 
+# Only trust X-Forwarded-For when running behind a known number of proxies
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# API keys that get their own fair-share slot instead of sharing their IP's
+SEARCH_API_KEYS = {key.strip() for key in os.getenv('SEARCH_API_KEYS', '').split(',') if key.strip()}
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
@@ -312,7 +325,8 @@ HTML_TEMPLATE = """
                     body: JSON.stringify({ 
                         interests, 
                         keywords, 
-                        num_results: parseInt(numResults) 
+                        num_results: parseInt(numResults),
+                        lazy_previews: true
                     })
                 });
                 
@@ -329,11 +343,12 @@ HTML_TEMPLATE = """
                                 <h3>${i + 1}. ${article.title}</h3>
                                 <div class="source">📍 Source: ${article.source}</div>
                                 <div><a href="${article.url}" target="_blank" class="article-url">${article.url}</a></div>
-                                <div class="preview">${article.content_preview || article.description || 'No preview available'}</div>
+                                <div class="preview" data-token="${article.preview_token || ''}">${article.content_preview || article.description || 'No preview available'}</div>
                             </div>
                         `;
                     });
                     resultsEl.innerHTML = html;
+                    observePreviews(resultsEl);
                 } else {
                     resultsEl.innerHTML = '<div class="no-results">🔍 No relevant articles found. Try different keywords or broader interests.</div>';
                 }
@@ -344,6 +359,48 @@ HTML_TEMPLATE = """
             loadingEl.classList.remove('show');
         }
 
+        // Lazy previews: fetch content only for articles that scroll into view
+        const PREFETCH_PREVIEWS = 3;
+        let previewObserver = null;
+
+        async function loadPreview(el) {
+            const token = el.dataset.token;
+            if (!token) return;
+            el.dataset.token = '';
+            previewObserver.unobserve(el);
+            try {
+                const response = await fetch(`/api/preview?token=${encodeURIComponent(token)}`);
+                const data = await response.json();
+                if (data.content_preview) {
+                    el.textContent = data.content_preview;
+                } else if (response.status === 503) {
+                    // Shed by the server - try again once it has capacity
+                    const retryAfter = parseInt(response.headers.get('Retry-After') || '5');
+                    setTimeout(() => {
+                        el.dataset.token = token;
+                        previewObserver.observe(el);
+                    }, retryAfter * 1000);
+                }
+            } catch (error) {
+                console.warn('Preview failed', error);
+            }
+        }
+
+        function observePreviews(container) {
+            if (previewObserver) previewObserver.disconnect();
+            const previews = container.querySelectorAll('.preview[data-token]:not([data-token=""])');
+            previewObserver = new IntersectionObserver(entries => {
+                entries.forEach(entry => {
+                    if (entry.isIntersecting) loadPreview(entry.target);
+                });
+            }, { rootMargin: '200px' });
+            previews.forEach((el, i) => {
+                previewObserver.observe(el);
+                // Speculatively prefetch the top results
+                if (i < PREFETCH_PREVIEWS) loadPreview(el);
+            });
+        }
+
         // Allow Enter key to trigger search
         document.getElementById('keywords').addEventListener('keypress', function(e) {
             if (e.key === 'Enter') {
@@ -359,12 +416,21 @@ HTML_TEMPLATE = """
 def index():
     return render_template_string(HTML_TEMPLATE)
 
+def client_id():
+    """Identify the caller for fair sharing: a configured API key, otherwise the client IP"""
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key in SEARCH_API_KEYS:
+        return f"key:{api_key}"
+    # remote_addr is only rewritten from X-Forwarded-For by ProxyFix when TRUSTED_PROXY_HOPS is set
+    return f"ip:{request.remote_addr}"
+
 @app.route('/api/search', methods=['POST'])
 def search_articles():
     data = request.json
     keywords = data.get('keywords', '')
     interests = data.get('interests', '')
     num_results = data.get('num_results', 10)
+    lazy_previews = data.get('lazy_previews', False)
     
     print(f"🔍 Search request: keywords='{keywords}', interests='{interests[:50]}...', num_results={num_results}")
     
@@ -380,20 +446,101 @@ def search_articles():
     if not api_key:
         return jsonify({'error': 'ANTHROPIC_API_KEY not configured'}), 500
     
+    # Opt-in sampling profile of the whole request
+    profiler = None
+    if profiling.should_profile(request.headers, allow_header=admin_authorized()):
+        profiler = profiling.RequestProfiler('api_search').start()
+    
     # Run the async function in a new event loop
     async def run_scraper():
+        if profiler:
+            profiler.attach_loop(asyncio.get_running_loop())
         async with ArticleScraper(api_key) as scraper:
-            articles = await scraper.search_all_sources(keywords, interests, num_results)
+            articles = await scraper.search_all_sources(keywords, interests, num_results, lazy_previews)
             return articles
     
+    client = client_id()
     try:
-        print("🚀 Starting article search...")
-        articles = asyncio.run(run_scraper())
+        # Bounded concurrency with a fair per-client queue; sheds with 503 when overloaded
+        with search_admission.admit(client):
+            print("🚀 Starting article search...")
+            articles = asyncio.run(run_scraper())
         print(f"✅ Search completed: found {len(articles)} articles")
-        return jsonify({'articles': articles})
+        response = jsonify({'articles': articles})
+    except Overloaded as e:
+        print(f"🚦 Shed search from {client}: {e}")
+        response = app.make_response((jsonify({'error': str(e)}), 503))
+        response.headers['Retry-After'] = str(e.retry_after)
     except Exception as e:
         print(f"❌ Search failed: {e}")
+        response = jsonify({'error': str(e)}), 500
+    
+    if profiler:
+        profiler.stop()
+        response = app.make_response(response)
+        response.headers['X-Profile-Id'] = profiler.profile_id
+    return response
+
+@app.route('/api/preview')
+def preview_article():
+    token = request.args.get('token', '')
+    if not token:
+        return jsonify({'error': 'Preview token is required'}), 400
+    
+    # Reject unknown or expired tokens before they cost a slot, a loop or a transport
+    target = shared_cache.get('preview_token', token)
+    if target is None:
+        return jsonify({'error': 'Preview token expired'}), 404
+    
+    # Previews only need a small transport, not the full search scraper
+    async def run_preview():
+        async with ContentScraper(limit=10, limit_per_host=4) as scraper:
+            return await scraper.build_preview(target['url'], target['description'])
+    
+    client = client_id()
+    try:
+        with preview_admission.admit(client):
+            preview = asyncio.run(run_preview())
+    except Overloaded as e:
+        print(f"🚦 Shed preview from {client}: {e}")
+        response = app.make_response((jsonify({'error': str(e)}), 503))
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except Exception as e:
+        print(f"❌ Preview failed: {e}")
         return jsonify({'error': str(e)}), 500
+    
+    return jsonify({'content_preview': preview})
+
+def admin_authorized():
+    # Admin features stay off unless ADMIN_TOKEN is configured
+    admin_token = os.getenv('ADMIN_TOKEN')
+    return bool(admin_token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token)
+
+@app.route('/admin/admission')
+def admission_stats():
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({
+        'search': search_admission.stats(),
+        'preview': preview_admission.stats()
+    })
+
+@app.route('/admin/profiles')
+def list_profiles():
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'profiles': profiling.list_profiles()})
+
+@app.route('/admin/profiles/<profile_id>')
+def get_profile(profile_id):
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    path = profiling.profile_path(profile_id)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), mimetype='text/plain', as_attachment=True,
+                     download_name=f"{profile_id}.folded")
 
 def run_async_route(func):
     """Helper to run async routes"""
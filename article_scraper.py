@@ -7,15 +7,414 @@ import json
 from typing import List, Dict, Optional
 import anthropic
 import os
-from urllib.parse import urljoin, quote_plus
+from urllib.parse import urljoin, quote_plus, urlparse
 import re
+import time
+import threading
+from collections import OrderedDict, deque
+import hashlib
+from shared_cache import shared_cache
+from transport import create_transport
 
-class RobustArticleScraper:
-    def __init__(self, anthropic_api_key: str):
+class SourceAllocator:
+    """Split the per-request fetch budget across sources based on observed yield
+
+    Statistics live in the shared cache so every worker sees the same numbers.
+    Observations are buffered per search and replayed onto the latest stored
+    statistics under a cross-process lock, so concurrent searches never
+    overwrite each other's updates.
+    """
+
+    # Static split used before any statistics have been collected
+    DEFAULT_SHARES = {
+        'hacker_news': 0.25,
+        'reddit': 0.25,
+        'arxiv': 0.25,
+        'rss': 0.5,
+        'allsides': 0.25
+    }
+    # Hard caps per source (arXiv results are slow to come back and rarely needed in bulk)
+    MAX_PER_SOURCE = {'arxiv': 5}
+    MIN_PER_SOURCE = 1
+    # Weight given to older observations when new ones arrive
+    DECAY = 0.8
+    # Pseudo-results at the average yield of all sources, so a new or unlucky
+    # source keeps getting a chance without outscoring sources that work
+    PRIOR_WEIGHT = 2.0
+    DEFAULT_YIELD = 0.5
+    STATS_TTL = 30 * 24 * 3600
+    SAVE_ATTEMPTS = 3
+
+    def __init__(self):
+        self.stats = None
+        # Observations from this search, replayed onto the shared stats on save
+        self.pending = []
+
+    def load(self):
+        self.stats = shared_cache.get('source_stats', 'all') or {}
+
+    async def save(self):
+        """Merge this search's observations into the shared statistics"""
+        if not self.pending:
+            return
+        lock_name = 'source_stats'
+        for _ in range(self.SAVE_ATTEMPTS):
+            if shared_cache.acquire_lock(lock_name):
+                break
+            await shared_cache.async_wait_for_unlock(lock_name, timeout=5)
+        else:
+            print("⚠️ Could not lock source stats, dropping this search's observations")
+            return
+        try:
+            stats = shared_cache.get('source_stats', 'all') or {}
+            for observation in self.pending:
+                self._apply(stats, *observation)
+            shared_cache.set('source_stats', 'all', stats, self.STATS_TTL)
+            self.stats = stats
+            self.pending = []
+        finally:
+            shared_cache.release_lock(lock_name)
+
+    def _apply(self, stats: Dict, kind: str, source: str, count: int, latency: float = 0.0):
+        source_stats = stats.setdefault(source, {'fetched': 0.0, 'kept': 0.0, 'latency': None})
+        if kind == 'fetch':
+            # An empty or failed fetch says nothing about yield - decaying here
+            # would pull a broken source back up to the prior
+            if count:
+                source_stats['fetched'] = source_stats['fetched'] * self.DECAY + count
+                source_stats['kept'] = source_stats['kept'] * self.DECAY
+            if source_stats['latency'] is None:
+                source_stats['latency'] = latency
+            else:
+                source_stats['latency'] = source_stats['latency'] * self.DECAY + latency * (1 - self.DECAY)
+        else:
+            source_stats['kept'] += count
+
+    def average_yield(self) -> float:
+        fetched = sum(stats.get('fetched', 0.0) for stats in self.stats.values())
+        kept = sum(stats.get('kept', 0.0) for stats in self.stats.values())
+        return kept / fetched if fetched else self.DEFAULT_YIELD
+
+    def expected_yield(self, source: str, prior: Optional[float] = None) -> float:
+        if prior is None:
+            prior = self.average_yield()
+        stats = self.stats.get(source, {})
+        kept = stats.get('kept', 0.0) + self.PRIOR_WEIGHT * prior
+        fetched = stats.get('fetched', 0.0) + self.PRIOR_WEIGHT
+        return kept / fetched
+
+    def allocate(self, num_results: int) -> Dict[str, int]:
+        """Return how many results to request from each source for this search"""
+        if self.stats is None:
+            self.load()
+        budget = sum(max(int(num_results * share), self.MIN_PER_SOURCE)
+                     for share in self.DEFAULT_SHARES.values())
+        # Score by yield (kept / fetched). Sources run concurrently and make one
+        # request each whatever their count, so shifting budget does not change
+        # wall time; what it changes is how many articles go into the Claude
+        # prompt. Each fetched article costs roughly the same prompt tokens, so
+        # yield is expected relevant results per token spent on filtering.
+        # Latency is still tracked for reporting.
+        prior = self.average_yield()
+        scores = {source: self.expected_yield(source, prior) for source in self.DEFAULT_SHARES}
+        # The default shares reflect how many results each source can usefully
+        # return; yield scales them. With no history every score is the prior
+        # and this reduces to the static split.
+        weights = {source: share * scores[source] for source, share in self.DEFAULT_SHARES.items()}
+        total_weight = sum(weights.values())
+        allocation = {source: self.MIN_PER_SOURCE for source in weights}
+        remaining = budget - len(allocation) * self.MIN_PER_SOURCE
+        for source, weight in weights.items():
+            allocation[source] += int(remaining * weight / total_weight)
+        for source, cap in self.MAX_PER_SOURCE.items():
+            allocation[source] = min(allocation[source], cap)
+        # Slots lost to rounding or caps go to the best uncapped sources
+        ranked = sorted(scores, key=lambda source: (scores[source], self.DEFAULT_SHARES[source]), reverse=True)
+        leftover = budget - sum(allocation.values())
+        for source in ranked:
+            if leftover <= 0:
+                break
+            cap = self.MAX_PER_SOURCE.get(source)
+            extra = leftover if cap is None else min(leftover, cap - allocation[source])
+            allocation[source] += extra
+            leftover -= extra
+        return allocation
+
+    def record_fetch(self, source: str, fetched: int, latency: float):
+        self.pending.append(('fetch', source, fetched, latency))
+
+    def record_kept(self, source: str, kept: int):
+        self.pending.append(('kept', source, kept))
+
+
+class FeedState:
+    """High-water mark for one RSS feed so repeat polls only process new entries"""
+
+    MAX_SEEN = 500
+    MAX_ENTRIES = 200
+    MAX_MATCH_SETS = 32
+
+    def __init__(self):
+        # Version of the shared feed body this process last parsed
+        self.version = None
+        self.newest_published = None
+        # Newest published time among GUIDs evicted from the seen-set
+        self.evicted_published = None
+        self.seen_order = deque()
+        self.seen_ids = set()
+        # Newest first, lightweight copies of the entries we have already parsed
+        self.entries = deque(maxlen=self.MAX_ENTRIES)
+        # Cached matches per keyword set, newest first
+        self.matches = OrderedDict()
+        # Held across version check, parse and update; the Flask server is threaded
+        self.lock = threading.Lock()
+
+    def _mark_seen(self, entry_id: str, published):
+        self.seen_ids.add(entry_id)
+        self.seen_order.append((entry_id, published))
+        if len(self.seen_order) > self.MAX_SEEN:
+            evicted_id, evicted_published = self.seen_order.popleft()
+            self.seen_ids.discard(evicted_id)
+            if evicted_published and (self.evicted_published is None or evicted_published > self.evicted_published):
+                self.evicted_published = evicted_published
+
+    def is_new(self, entry_id: str, published) -> bool:
+        if entry_id in self.seen_ids:
+            return False
+        # An unknown GUID is only treated as old when it could have been evicted
+        # from the seen-set, i.e. it is no newer than something we evicted
+        if published and self.evicted_published and published <= self.evicted_published:
+            return False
+        return True
+
+    def add_entries(self, new_entries: List[Dict]):
+        """Record entries (newest first) and extend every cached match list"""
+        for record in reversed(new_entries):
+            self._mark_seen(record['id'], record['published'])
+            self.entries.appendleft(record)
+            if record['published'] and (self.newest_published is None or record['published'] > self.newest_published):
+                self.newest_published = record['published']
+        for keywords_key, matched in list(self.matches.items()):
+            new_matches = [record for record in new_entries if self._entry_matches(record, keywords_key)]
+            if new_matches:
+                self.matches[keywords_key] = (new_matches + matched)[:self.MAX_ENTRIES]
+
+    def get_matches(self, keywords_lower: List[str]) -> List[Dict]:
+        keywords_key = tuple(keywords_lower)
+        if keywords_key in self.matches:
+            self.matches.move_to_end(keywords_key)
+        else:
+            self.matches[keywords_key] = [record for record in self.entries
+                                          if self._entry_matches(record, keywords_key)]
+            if len(self.matches) > self.MAX_MATCH_SETS:
+                self.matches.popitem(last=False)
+        return self.matches[keywords_key]
+
+    @staticmethod
+    def _entry_matches(record: Dict, keywords_lower) -> bool:
+        return any(keyword in record['title_lower'] or keyword in record['description']
+                   for keyword in keywords_lower)
+
+
+# Shared by every scraper instance in this process, keyed by feed URL
+_feed_states: Dict[str, FeedState] = {}
+
+# Shared cache lifetimes (seconds)
+FEED_TTL = 120
+FEED_RETAIN = 24 * 3600
+CONTENT_TTL = 6 * 3600
+# Non-HTML, oversized and 4xx targets are remembered briefly so workers do not refetch them
+NEGATIVE_CONTENT_TTL = 15 * 60
+# Client errors that are worth retrying rather than caching
+TRANSIENT_STATUSES = (408, 425, 429)
+DOMAIN_TYPES_TTL = 7 * 24 * 3600
+VERDICT_TTL = 24 * 3600
+PREVIEW_TOKEN_TTL = 3600
+
+
+# URL rules for scrape targets that are never HTML articles
+NON_HTML_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg',
+    '.mp4', '.webm', '.mov', '.mp3', '.zip', '.gz', '.tar'
+)
+NON_HTML_HOSTS = ('i.redd.it', 'v.redd.it', 'preview.redd.it', 'i.imgur.com', 'pbs.twimg.com')
+# Pages whose useful text we already hold in the search result description
+DESCRIPTION_ONLY_PATTERNS = [
+    re.compile(r'^https?://(export\.)?arxiv\.org/(abs|pdf)/'),
+    re.compile(r'^https?://(www\.)?(youtube\.com/watch|youtu\.be/)')
+]
+MAX_SCRAPE_BYTES = 5 * 1024 * 1024
+# A domain is skipped once it has served this many non-HTML responses and no HTML
+DOMAIN_SKIP_THRESHOLD = 3
+
+# Content types learned per domain from response headers are kept in the shared
+# cache under 'domain_types' as {'html': n, 'other': n}
+
+
+def classify_url(url: str) -> str:
+    """Classify a scrape target before fetching: 'html', 'non_html' or 'description_only'"""
+    parsed = urlparse(url)
+    domain = parsed.netloc.lower()
+    if parsed.path.lower().endswith(NON_HTML_EXTENSIONS) or domain in NON_HTML_HOSTS:
+        return 'non_html'
+    if any(pattern.match(url) for pattern in DESCRIPTION_ONLY_PATTERNS):
+        return 'description_only'
+    learned = shared_cache.get('domain_types', domain)
+    if learned and learned['html'] == 0 and learned['other'] >= DOMAIN_SKIP_THRESHOLD:
+        return 'non_html'
+    return 'html'
+
+
+def record_content_type(url: str, content_type: str):
+    """Remember whether a domain serves HTML so later fetches can be skipped up front"""
+    domain = urlparse(url).netloc.lower()
+    learned = shared_cache.get('domain_types', domain) or {'html': 0, 'other': 0}
+    if 'html' in content_type or 'xml' in content_type:
+        learned['html'] += 1
+    else:
+        learned['other'] += 1
+    # Counts only steer a heuristic, so a lost update between workers is harmless
+    shared_cache.set('domain_types', domain, learned, DOMAIN_TYPES_TTL)
+
+
+class ContentScraper:
+    """Article content fetching and previews, without the search sources or Claude client"""
+
+    def __init__(self, transport: Optional[str] = None, **transport_options):
+        # HTTP backend name ('aiohttp' or 'httpx'), defaults to HTTP_TRANSPORT
+        self.transport_name = transport
+        self.transport_options = transport_options
+        self.transport = None
+
+    async def __aenter__(self):
+        self.transport = create_transport(self.transport_name, **self.transport_options)
+        print(f"🌐 Using {self.transport.name} transport")
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.transport:
+            await self.transport.close()
+
+    async def scrape_article_content(self, url: str) -> str:
+        """Enhanced article content scraping"""
+        kind = classify_url(url)
+        if kind != 'html':
+            print(f"  ⏭️ Skipping {kind} target: {url}")
+            return ""
+        
+        # Extracted text is shared across workers; permanent failures are cached
+        # briefly as "", transient ones (None) are not cached at all
+        async def refresh():
+            return await self.fetch_article_content(url)
+        
+        content = await shared_cache.get_or_refresh('content', url, CONTENT_TTL, refresh,
+                                                    negative_ttl=NEGATIVE_CONTENT_TTL)
+        return content or ""
+
+    async def fetch_article_content(self, url: str) -> Optional[str]:
+        """Download and extract the main text of an article page
+
+        Returns "" when the target will not yield content (non-HTML, oversized,
+        4xx) and None when the failure may be temporary (timeouts, connection
+        errors, 5xx), so only the former is negatively cached.
+        """
+        try:
+            async with self.transport.get(url, timeout=15) as response:
+                if response.status != 200:
+                    if 400 <= response.status < 500 and response.status not in TRANSIENT_STATUSES:
+                        return ""
+                    print(f"  ⚠️ HTTP {response.status} scraping {url}, not caching")
+                    return None
+                
+                # Check the headers before reading the body
+                content_type = response.headers.get('Content-Type', '').lower()
+                if content_type:
+                    # Learn under the requested domain, which is what classify_url
+                    # looks up, and under the final one if we were redirected
+                    record_content_type(url, content_type)
+                    if urlparse(str(response.url)).netloc.lower() != urlparse(url).netloc.lower():
+                        record_content_type(str(response.url), content_type)
+                    if 'html' not in content_type and 'xml' not in content_type:
+                        print(f"  ⏭️ Aborting non-HTML response ({content_type}): {url}")
+                        return ""
+                if response.content_length and response.content_length > MAX_SCRAPE_BYTES:
+                    print(f"  ⏭️ Aborting oversized response ({response.content_length} bytes): {url}")
+                    return ""
+                
+                # Content-Length is missing on chunked bodies, so cap the read itself
+                body = await response.read_limited(MAX_SCRAPE_BYTES + 1)
+                if len(body) > MAX_SCRAPE_BYTES:
+                    print(f"  ⏭️ Aborting oversized response (over {MAX_SCRAPE_BYTES} bytes): {url}")
+                    return ""
+                try:
+                    html = body.decode(response.charset or 'utf-8', errors='replace')
+                except LookupError:
+                    # Unknown charset name in the header
+                    html = body.decode('utf-8', errors='replace')
+                soup = BeautifulSoup(html, 'html.parser')
+                
+                # Remove unwanted elements
+                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'sidebar', 'aside', 'advertisement']):
+                    element.decompose()
+                
+                # Try multiple content selectors (ordered by preference)
+                content_selectors = [
+                    'article',
+                    '[role="main"]',
+                    '.post-content',
+                    '.article-content',
+                    '.content',
+                    '.entry-content',
+                    '.post-body',
+                    'main',
+                    '.story-body',
+                    '#content'
+                ]
+                
+                content = None
+                for selector in content_selectors:
+                    content = soup.select_one(selector)
+                    if content and len(content.get_text(strip=True)) > 200:
+                        break
+                
+                if not content:
+                    content = soup.body
+                
+                if content:
+                    text = content.get_text(separator=' ', strip=True)
+                    # Clean up the text
+                    text = re.sub(r'\s+', ' ', text)  # Multiple whitespace to single space
+                    return text[:5000]  # Limit to 5000 chars
+                    
+        except Exception as e:
+            print(f"Error scraping {url}: {e}")
+            return None
+        return ""
+
+    def register_preview(self, article: Dict) -> str:
+        """Hand out a token the UI can exchange for the article preview later"""
+        token = hashlib.sha1(article['url'].encode()).hexdigest()[:16]
+        shared_cache.set('preview_token', token, {
+            'url': article['url'],
+            'description': article.get('description', '')
+        }, PREVIEW_TOKEN_TTL)
+        return token
+
+    async def build_preview(self, url: str, description: str) -> str:
+        content = await self.scrape_article_content(url)
+        if not content:
+            # Non-HTML or failed targets keep the description from the search result
+            content = description
+        return content[:500] + "..." if len(content) > 500 else content
+
+
+class RobustArticleScraper(ContentScraper):
+    def __init__(self, anthropic_api_key: str, transport: Optional[str] = None):
         # Try multiple methods to create Anthropic client
         self.client = None
         self.api_key = anthropic_api_key
-        self.session = None
+        super().__init__(transport)
+        self.allocator = SourceAllocator()
             
         # Multiple news sources with RSS feeds and APIs
         self.news_sources = {
@@ -67,28 +466,13 @@ class RobustArticleScraper:
         else:
             print("⚠️ No valid API key provided - AI filtering disabled")
 
-    async def __aenter__(self):
-        # Create session with minimal configuration to avoid proxy issues
-        connector = aiohttp.TCPConnector(limit=100, limit_per_host=30)
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        )
-        return self
-    
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-
     async def search_hacker_news(self, keywords: str, limit: int = 10) -> List[Dict]:
         """Search Hacker News using RSS"""
         try:
             search_url = self.news_sources['hacker_news']['search_rss'].format(keywords=quote_plus(keywords))
             print(f"Searching Hacker News: {search_url}")
             
-            async with self.session.get(search_url) as response:
+            async with self.transport.get(search_url) as response:
                 if response.status == 200:
                     content = await response.text()
                     feed = feedparser.parse(content)
@@ -114,7 +498,7 @@ class RobustArticleScraper:
             
             print(f"Searching Reddit: {search_url}")
             
-            async with self.session.get(search_url) as response:
+            async with self.transport.get(search_url) as response:
                 if response.status == 200:
                     data = await response.json()
                     
@@ -142,7 +526,7 @@ class RobustArticleScraper:
             )
             print(f"Searching arXiv: {search_url}")
             
-            async with self.session.get(search_url) as response:
+            async with self.transport.get(search_url) as response:
                 if response.status == 200:
                     content = await response.text()
                     # Parse XML response
@@ -168,6 +552,71 @@ class RobustArticleScraper:
             print(f"arXiv search failed: {e}")
         return []
 
+    async def fetch_feed_shared(self, feed_url: str) -> Optional[Dict]:
+        """Fetch a feed body through the shared cache so only one worker refreshes it at a time"""
+        cached_feed = shared_cache.get('feed', feed_url)
+        if cached_feed and time.time() - cached_feed['fetched_at'] < FEED_TTL:
+            return cached_feed
+        
+        lock_name = f"feed:{feed_url}"
+        if not shared_cache.acquire_lock(lock_name):
+            # Another worker is refreshing this feed - wait for its result
+            await shared_cache.async_wait_for_unlock(lock_name)
+            return shared_cache.get('feed', feed_url) or cached_feed
+        
+        try:
+            # Conditional GET so unchanged feeds are not downloaded or parsed again
+            headers = {}
+            if cached_feed and cached_feed.get('etag'):
+                headers['If-None-Match'] = cached_feed['etag']
+            if cached_feed and cached_feed.get('last_modified'):
+                headers['If-Modified-Since'] = cached_feed['last_modified']
+            
+            async with self.transport.get(feed_url, headers=headers) as response:
+                if response.status == 200:
+                    now = time.time()
+                    cached_feed = {
+                        'content': await response.text(),
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'fetched_at': now,
+                        'version': now
+                    }
+                elif response.status == 304 and cached_feed:
+                    cached_feed['fetched_at'] = time.time()
+                else:
+                    return None
+            shared_cache.set('feed', feed_url, cached_feed, FEED_RETAIN)
+            return cached_feed
+        finally:
+            shared_cache.release_lock(lock_name)
+
+    @staticmethod
+    def parse_new_entries(state: FeedState, content: str) -> List[Dict]:
+        """Parse a feed body and build records for the entries state has not seen yet"""
+        feed = feedparser.parse(content)
+        source = feed.feed.title if hasattr(feed.feed, 'title') else 'RSS Feed'
+        
+        new_entries = []
+        for entry in feed.entries:
+            entry_id = entry.get('id') or entry.get('link') or entry.get('title', '')
+            published = tuple(entry.published_parsed) if entry.get('published_parsed') else None
+            if not state.is_new(entry_id, published):
+                continue
+            
+            description = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
+            description = description.lower()
+            new_entries.append({
+                'id': entry_id,
+                'published': published,
+                'title': entry.title if hasattr(entry, 'title') else 'No Title',
+                'title_lower': entry.title.lower() if hasattr(entry, 'title') else '',
+                'url': entry.link if hasattr(entry, 'link') else '',
+                'source': source,
+                'description': description
+            })
+        return new_entries
+
     async def search_rss_feeds(self, keywords: str, limit: int = 15) -> List[Dict]:
         """Search multiple RSS feeds for articles"""
         articles = []
@@ -176,31 +625,38 @@ class RobustArticleScraper:
         for feed_url in self.news_sources['newsapi_sources']:
             try:
                 print(f"Checking RSS feed: {feed_url}")
+                state = _feed_states.setdefault(feed_url, FeedState())
                 
-                async with self.session.get(feed_url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        feed = feedparser.parse(content)
-                        
-                        for entry in feed.entries:
-                            # Check if keywords match title or description
-                            title = entry.title.lower() if hasattr(entry, 'title') else ''
-                            description = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
-                            description = description.lower()
-                            
-                            # Simple keyword matching
-                            if any(keyword in title or keyword in description for keyword in keywords_lower):
-                                articles.append({
-                                    'title': entry.title if hasattr(entry, 'title') else 'No Title',
-                                    'url': entry.link if hasattr(entry, 'link') else '',
-                                    'source': feed.feed.title if hasattr(feed.feed, 'title') else 'RSS Feed',
-                                    'timestamp': datetime.now().isoformat(),
-                                    'description': description[:200]
-                                })
-                        
-                        if len(articles) >= limit:
-                            break
-                            
+                cached_feed = await self.fetch_feed_shared(feed_url)
+                if cached_feed is None:
+                    continue
+                
+                with state.lock:
+                    # Only parse when the body changed since this process last saw it
+                    if cached_feed['version'] != state.version:
+                        new_entries = self.parse_new_entries(state, cached_feed['content'])
+                        print(f"  {len(new_entries)} new entries in {feed_url}")
+                        state.add_entries(new_entries)
+                        # Only mark the body processed once its entries are recorded
+                        state.version = cached_feed['version']
+                    else:
+                        print(f"  {feed_url} not modified")
+                    
+                    # Simple keyword matching, merged with matches from earlier polls
+                    matches = list(state.get_matches(keywords_lower))
+                
+                for record in matches:
+                    articles.append({
+                        'title': record['title'],
+                        'url': record['url'],
+                        'source': record['source'],
+                        'timestamp': datetime.now().isoformat(),
+                        'description': record['description'][:200]
+                    })
+                
+                if len(articles) >= limit:
+                    break
+                    
             except Exception as e:
                 print(f"RSS feed {feed_url} failed: {e}")
                 continue
@@ -213,7 +669,7 @@ class RobustArticleScraper:
             # Try AllSides news search (has a simple API)
             search_url = f"https://www.allsides.com/search/node/{quote_plus(keywords)}"
             
-            async with self.session.get(search_url) as response:
+            async with self.transport.get(search_url) as response:
                 if response.status == 200:
                     html = await response.text()
                     soup = BeautifulSoup(html, 'html.parser')
@@ -236,74 +692,29 @@ class RobustArticleScraper:
             print(f"NewsAPI fallback failed: {e}")
         return []
 
-    async def scrape_article_content(self, url: str) -> str:
-        """Enhanced article content scraping"""
-        try:
-            async with self.session.get(url, timeout=15) as response:
-                if response.status != 200:
-                    return ""
-                    
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'sidebar', 'aside', 'advertisement']):
-                    element.decompose()
-                
-                # Try multiple content selectors (ordered by preference)
-                content_selectors = [
-                    'article',
-                    '[role="main"]',
-                    '.post-content',
-                    '.article-content',
-                    '.content',
-                    '.entry-content',
-                    '.post-body',
-                    'main',
-                    '.story-body',
-                    '#content'
-                ]
-                
-                content = None
-                for selector in content_selectors:
-                    content = soup.select_one(selector)
-                    if content and len(content.get_text(strip=True)) > 200:
-                        break
-                
-                if not content:
-                    content = soup.body
-                
-                if content:
-                    text = content.get_text(separator=' ', strip=True)
-                    # Clean up the text
-                    text = re.sub(r'\s+', ' ', text)  # Multiple whitespace to single space
-                    return text[:5000]  # Limit to 5000 chars
-                    
-        except Exception as e:
-            print(f"Error scraping {url}: {e}")
-        return ""
+    @staticmethod
+    def verdict_key(article: Dict, user_interests: str) -> str:
+        return hashlib.sha1(f"{user_interests}\n{article['url']}\n{article['title']}".encode()).hexdigest()
 
-    def filter_relevant_articles(self, articles: List[Dict], user_interests: str) -> List[Dict]:
-        """Use Claude to filter articles based on user interests, with fallback to simple filtering"""
-        if not articles:
-            print("No articles to filter")
-            return []
+    def cached_verdicts(self, articles: List[Dict], user_interests: str) -> List[Optional[bool]]:
+        """Look up relevance verdicts other requests or workers already paid for"""
+        return [shared_cache.get('verdict', self.verdict_key(art, user_interests)) for art in articles]
+
+    def ai_filter_indices(self, articles: List[Dict], user_interests: str) -> Optional[List[int]]:
+        """Ask Claude which articles are relevant, returning 1-indexed positions or None on failure"""
+        print(f"🤖 Filtering {len(articles)} articles with AI...")
         
-        # If we have a working Anthropic client, use AI filtering
-        if self.client:
-            print(f"🤖 Filtering {len(articles)} articles with AI...")
-            
-            # Create article summaries for AI
-            article_summaries = []
-            for i, art in enumerate(articles):
-                summary = f"Article {i+1}:\nTitle: {art['title']}\nSource: {art['source']}"
-                if art.get('description'):
-                    summary += f"\nDescription: {art['description'][:150]}"
-                article_summaries.append(summary)
-            
-            articles_text = "\n---\n".join(article_summaries)
-            
-            prompt = f"""Filter these articles based on user interests.
+        # Create article summaries for AI
+        article_summaries = []
+        for i, art in enumerate(articles):
+            summary = f"Article {i+1}:\nTitle: {art['title']}\nSource: {art['source']}"
+            if art.get('description'):
+                summary += f"\nDescription: {art['description'][:150]}"
+            article_summaries.append(summary)
+        
+        articles_text = "\n---\n".join(article_summaries)
+        
+        prompt = f"""Filter these articles based on user interests.
 
             User Interests: {user_interests}
 
@@ -320,26 +731,67 @@ class RobustArticleScraper:
 
             Do not include any explanation, just the JSON array."""
 
+        try:
+            message = self.client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=500,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            
+            response_text = message.content[0].text.strip()
+            print(f"🤖 Claude response: {response_text}")
+            
+            # Extract JSON array
+            start = response_text.find('[')
+            end = response_text.find(']') + 1
+            if start != -1 and end > start:
+                return json.loads(response_text[start:end])
+        except Exception as e:
+            print(f"❌ AI filtering failed: {e}")
+        return None
+
+    async def filter_relevant_articles(self, articles: List[Dict], user_interests: str) -> List[Dict]:
+        """Use Claude to filter articles based on user interests, with fallback to simple filtering"""
+        if not articles:
+            print("No articles to filter")
+            return []
+        
+        # If we have a working Anthropic client, use AI filtering
+        if self.client:
+            verdicts = self.cached_verdicts(articles, user_interests)
+            unknown = [art for art, verdict in zip(articles, verdicts) if verdict is None]
+            lock_name = None
+            if unknown:
+                # Coalesce identical Claude calls across workers
+                batch_key = hashlib.sha1('\n'.join([user_interests] + sorted(art['url'] for art in unknown)).encode()).hexdigest()
+                lock_name = f"verdicts:{batch_key}"
+                if not shared_cache.acquire_lock(lock_name):
+                    print("⏳ Another worker is filtering the same articles, waiting...")
+                    await shared_cache.async_wait_for_unlock(lock_name)
+                    lock_name = None
+                    verdicts = self.cached_verdicts(articles, user_interests)
+                    unknown = [art for art, verdict in zip(articles, verdicts) if verdict is None]
+            else:
+                print(f"🎯 All {len(articles)} relevance verdicts served from the shared cache")
+            
             try:
-                message = self.client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=500,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                response_text = message.content[0].text.strip()
-                print(f"🤖 Claude response: {response_text}")
-                
-                # Extract JSON array
-                start = response_text.find('[')
-                end = response_text.find(']') + 1
-                if start != -1 and end > start:
-                    relevant_indices = json.loads(response_text[start:end])
-                    relevant_articles = [articles[i-1] for i in relevant_indices if 0 < i <= len(articles)]
+                relevant_indices = []
+                if unknown:
+                    # The Anthropic client is synchronous - keep it off the event loop
+                    loop = asyncio.get_running_loop()
+                    relevant_indices = await loop.run_in_executor(None, self.ai_filter_indices, unknown, user_interests)
+                if relevant_indices is not None:
+                    relevant_urls = {unknown[i-1]['url'] for i in relevant_indices if 0 < i <= len(unknown)}
+                    for art in unknown:
+                        shared_cache.set('verdict', self.verdict_key(art, user_interests),
+                                         art['url'] in relevant_urls, VERDICT_TTL)
+                    relevant_articles = [art for art, verdict in zip(articles, verdicts)
+                                         if verdict or (verdict is None and art['url'] in relevant_urls)]
                     print(f"🎯 AI found {len(relevant_articles)} relevant articles")
                     return relevant_articles
-            except Exception as e:
-                print(f"❌ AI filtering failed: {e}")
+            finally:
+                if lock_name:
+                    shared_cache.release_lock(lock_name)
         
         # Fallback to simple keyword filtering
         print(f"📝 Using simple keyword filtering for {len(articles)} articles")
@@ -360,34 +812,61 @@ class RobustArticleScraper:
         print(f"📝 Simple filtering found {len(filtered_articles)} potentially relevant articles")
         return filtered_articles[:15]
 
-    async def search_all_sources(self, keywords: str, interests: str, num_results: int = 20) -> List[Dict]:
-        """Search all available sources and combine results"""
+    async def search_all_sources(self, keywords: str, interests: str, num_results: int = 20,
+                                 lazy_previews: bool = False) -> List[Dict]:
+        """Search all available sources and combine results
+
+        With lazy_previews the content is not scraped here; each article gets a
+        preview_token for /api/preview instead.
+        """
         print(f"🔍 Searching for: '{keywords}'")
         
+        # Split the fetch budget using observed per-source yield and latency
+        allocation = self.allocator.allocate(num_results)
+        print(f"📐 Fetch allocation: {allocation}")
+        
+        searches = {
+            'hacker_news': self.search_hacker_news,
+            'reddit': self.search_reddit,
+            'arxiv': self.search_arxiv,
+            'rss': self.search_rss_feeds,
+            'allsides': self.search_newsapi_fallback
+        }
+        
+        timings = {}
+        
+        async def timed_search(source_key, search):
+            start = time.monotonic()
+            try:
+                return await search(keywords, allocation[source_key])
+            finally:
+                elapsed = time.monotonic() - start
+                print(f"⏱️ {source_key} finished in {elapsed:.2f}s")
+                timings[source_key] = elapsed
+        
         # Run all searches concurrently
-        search_tasks = [
-            self.search_hacker_news(keywords, num_results//4),
-            self.search_reddit(keywords, num_results//4),
-            self.search_arxiv(keywords, min(5, num_results//4)),
-            self.search_rss_feeds(keywords, num_results//2),
-            self.search_newsapi_fallback(keywords, num_results//4)
-        ]
+        source_keys = list(searches)
+        search_tasks = [timed_search(key, searches[key]) for key in source_keys]
         
         results = await asyncio.gather(*search_tasks, return_exceptions=True)
         
         # Combine all articles
         all_articles = []
         source_counts = {}
+        url_sources = {}
         
-        for i, result in enumerate(results):
+        for source_key, result in zip(source_keys, results):
             if isinstance(result, Exception):
-                print(f"Search {i} failed: {result}")
+                print(f"Search {source_key} failed: {result}")
+                self.allocator.record_fetch(source_key, 0, timings.get(source_key, 0.0))
                 continue
+            self.allocator.record_fetch(source_key, len(result or []), timings.get(source_key, 0.0))
             if result:
                 all_articles.extend(result)
                 for article in result:
                     source = article['source']
                     source_counts[source] = source_counts.get(source, 0) + 1
+                    url_sources.setdefault(article['url'], source_key)
         
         print(f"📊 Found articles from: {source_counts}")
         
@@ -402,14 +881,30 @@ class RobustArticleScraper:
         print(f"📝 {len(unique_articles)} unique articles before filtering")
         
         # Filter with AI
-        relevant_articles = self.filter_relevant_articles(unique_articles, interests)
+        relevant_articles = await self.filter_relevant_articles(unique_articles, interests)
+        
+        # Feed the kept counts back so the next search can rebalance
+        kept_counts = {}
+        for article in relevant_articles:
+            source_key = url_sources.get(article['url'])
+            if source_key:
+                kept_counts[source_key] = kept_counts.get(source_key, 0) + 1
+        for source_key, kept in kept_counts.items():
+            self.allocator.record_kept(source_key, kept)
+        await self.allocator.save()
+        
+        if lazy_previews:
+            # Return right away - previews are fetched on demand by the UI
+            for article in relevant_articles[:num_results]:
+                if article['url']:
+                    article['preview_token'] = self.register_preview(article)
+            return relevant_articles[:num_results]
         
         # Scrape content for the top relevant articles
         print("🔍 Scraping content for relevant articles...")
         for i, article in enumerate(relevant_articles[:10]):  # Limit content scraping
             if article['url']:
-                content = await self.scrape_article_content(article['url'])
-                article['content_preview'] = content[:500] + "..." if len(content) > 500 else content
+                article['content_preview'] = await self.build_preview(article['url'], article.get('description', ''))
                 print(f"  ✓ Scraped content for article {i+1}")
         
         return relevant_articles[:num_results]
@@ -0,0 +1,143 @@
+"""Head-to-head benchmark of the aiohttp (HTTP/1.1) and httpx (HTTP/2) transports
+
+Starts a local HTTP/1.1 server and a local cleartext HTTP/2 server, both adding
+the same artificial delay per response, then fires the same burst of requests
+at them through the transports the scraper uses. Reports latency percentiles,
+wall time and how many TCP connections each server had to accept.
+
+Usage: python benchmark_transports.py [--requests 300] [--concurrency 60] [--delay 0.02]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import h2.config
+import h2.connection
+import h2.events
+from aiohttp import web
+
+from transport import AiohttpTransport, HttpxTransport
+
+BODY = b'<html><body><article>' + b'benchmark payload ' * 200 + b'</article></body></html>'
+
+
+async def start_http1_server(delay: float, connections: set):
+    async def handler(request):
+        connections.add(request.transport.get_extra_info('peername'))
+        await asyncio.sleep(delay)
+        return web.Response(body=BODY, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+class H2Protocol(asyncio.Protocol):
+    """Minimal prior-knowledge (h2c) server answering every stream after a delay"""
+
+    def __init__(self, delay: float, connections: set):
+        self.delay = delay
+        self.connections = connections
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.connections.add(transport.get_extra_info('peername'))
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id))
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id: int):
+        await asyncio.sleep(self.delay)
+        if self.transport.is_closing():
+            return
+        self.conn.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'text/html'),
+            ('content-length', str(len(BODY)))
+        ])
+        self.conn.send_data(stream_id, BODY, end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+
+async def start_http2_server(delay: float, connections: set):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: H2Protocol(delay, connections), '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, port
+
+
+async def run_client(transport, url: str, num_requests: int, concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    versions = set()
+
+    async def fetch(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            async with transport.get(f"{url}/article/{i}") as response:
+                await response.text()
+                versions.add(getattr(response, 'http_version', 'HTTP/1.1'))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(i) for i in range(num_requests)))
+    wall = time.perf_counter() - start
+    await transport.close()
+
+    latencies.sort()
+    return {
+        'wall': wall,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'max': latencies[-1],
+        'versions': ', '.join(sorted(versions))
+    }
+
+
+async def main(args):
+    h1_connections, h2_connections = set(), set()
+    runner, h1_port = await start_http1_server(args.delay, h1_connections)
+    server, h2_port = await start_http2_server(args.delay, h2_connections)
+
+    cases = [
+        ('aiohttp  -> HTTP/1.1', lambda: AiohttpTransport(), f"http://127.0.0.1:{h1_port}", h1_connections),
+        ('httpx h1 -> HTTP/1.1', lambda: HttpxTransport(http2=False), f"http://127.0.0.1:{h1_port}", h1_connections),
+        # http1=False makes httpx speak HTTP/2 with prior knowledge over cleartext
+        ('httpx h2 -> HTTP/2', lambda: HttpxTransport(http1=False, http2=True), f"http://127.0.0.1:{h2_port}", h2_connections),
+    ]
+
+    print(f"📊 {args.requests} requests, concurrency {args.concurrency}, server delay {args.delay * 1000:.0f}ms\n")
+    print(f"{'case':<22} {'wall':>8} {'p50':>8} {'p95':>8} {'max':>8} {'conns':>6}  protocol")
+    try:
+        for name, make_transport, url, connections in cases:
+            connections.clear()
+            result = await run_client(make_transport(), url, args.requests, args.concurrency)
+            print(f"{name:<22} {result['wall'] * 1000:>6.0f}ms {result['p50'] * 1000:>6.1f}ms "
+                  f"{result['p95'] * 1000:>6.1f}ms {result['max'] * 1000:>6.1f}ms {len(connections):>6}  "
+                  f"{result['versions']}")
+    finally:
+        await runner.cleanup()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=60)
+    parser.add_argument('--delay', type=float, default=0.02, help='Artificial server delay in seconds')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Profiles are written here as folded stacks (flamegraph.pl / speedscope compatible)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+# Oldest profiles are deleted once there are more than this many
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_HEADER = 'X-Profile'
+# Folded stack counts are written in thousandths of a sample so split samples stay integers
+SAMPLE_UNITS = 1000
+
+# Frames that mean the event loop is idle and waiting on the network. Only the
+# selectors module counts, so e.g. soupsieve's select() is still CPU time.
+IDLE_FUNCTIONS = {'select', 'poll', 'epoll', 'kqueue'}
+IDLE_MODULE = 'selectors.py'
+
+
+def should_profile(headers, allow_header: bool = False) -> bool:
+    """Opt in via request header (only when allow_header) or the configured sampling rate"""
+    if allow_header and headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes'):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return code.co_name in IDLE_FUNCTIONS and os.path.basename(code.co_filename) == IDLE_MODULE
+
+
+def _thread_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _leaf_tasks(tasks) -> List:
+    """Drop tasks that are only waiting on other tasks (e.g. a parent blocked in gather)"""
+    pending = set(tasks)
+    parents = set()
+    for task in tasks:
+        waiter = getattr(task, '_fut_waiter', None)
+        if waiter is None:
+            continue
+        children = getattr(waiter, '_children', None) or [waiter]
+        if any(child in pending for child in children):
+            parents.add(task)
+    return [task for task in tasks if task not in parents]
+
+
+def _await_stack(task) -> List[str]:
+    """Walk a task's coroutine chain down to the innermost await"""
+    stack = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return stack
+
+
+class RequestProfiler:
+    """Sampling profiler for one request, run from a background thread
+
+    Samples the request thread's stack, which includes everything the event
+    loop started by asyncio.run executes. When the loop is idle in select()
+    the sample is split evenly across the await chains of the leaf tasks
+    (tasks not just waiting on other tasks), so network waits show up under
+    the stage that is waiting without inflating the total.
+    """
+
+    def __init__(self, name: str = 'request'):
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.name = name
+        self.samples = Counter()
+        self.loop = None
+        self._target_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._target_thread)
+        if frame is None:
+            return
+        stack = _thread_stack(frame)
+        if self.loop is not None and _is_idle(frame):
+            try:
+                tasks = [task for task in asyncio.all_tasks(self.loop) if not task.done()]
+            except RuntimeError:
+                # Task set changed while we were iterating - skip this sample
+                return
+            stacks = [await_stack for await_stack in map(_await_stack, _leaf_tasks(tasks)) if await_stack]
+            if stacks:
+                weight = SAMPLE_UNITS / len(stacks)
+                for await_stack in stacks:
+                    self.samples[';'.join([self.name, '[await]'] + await_stack)] += weight
+                return
+        self.samples[';'.join([self.name] + stack)] += SAMPLE_UNITS
+
+    def _run(self):
+        while not self._stop.wait(PROFILE_INTERVAL):
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"⚠️ Profiler sample failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.profile_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the folded stacks, returning the file path"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{self.profile_id}.folded")
+            with open(path, 'w') as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {round(count)}\n")
+            print(f"📈 Saved profile {self.profile_id} ({sum(self.samples.values()) / SAMPLE_UNITS:.0f} samples)")
+            prune_profiles()
+            return path
+        except Exception as e:
+            print(f"⚠️ Could not save profile {self.profile_id}: {e}")
+            return None
+
+
+def prune_profiles():
+    """Keep only the newest PROFILE_MAX_FILES profiles"""
+    profiles = list_profiles()
+    for profile in profiles[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, f"{profile['id']}.folded"))
+        except OSError as e:
+            print(f"⚠️ Could not delete old profile {profile['id']}: {e}")
+
+
+def list_profiles() -> List[Dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for filename in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if filename.endswith('.folded'):
+            path = os.path.join(PROFILE_DIR, filename)
+            profiles.append({
+                'id': filename[:-len('.folded')],
+                'size': os.path.getsize(path),
+                'created': os.path.getmtime(path)
+            })
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    # Profile ids are generated by us - reject anything that could escape PROFILE_DIR
+    if not profile_id or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
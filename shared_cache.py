@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', 'shared_cache.db')
+LOCK_TTL = 30
+LOCK_POLL_INTERVAL = 0.1
+
+
+class SharedCache:
+    """Cache shared by every worker process through a SQLite database in WAL mode
+
+    Values are stored as JSON under (namespace, key) with an expiry time. Locks
+    live in their own table so only one process refreshes a given entry while
+    the others wait for its result. Every operation fails soft: errors are
+    logged and treated as a cache miss so a broken cache never breaks a search.
+    """
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across forked workers or threads
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.owner = f"{self._pid}-{uuid.uuid4().hex[:8]}"
+            self._local = threading.local()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')
+            if not self._initialized:
+                conn.execute('''CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key))''')
+                conn.execute('''CREATE TABLE IF NOT EXISTS locks (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL)''')
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (namespace, key, time.time())
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"⚠️ Shared cache read failed for {namespace}:{key}: {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), time.time() + ttl)
+            )
+            # Occasionally drop expired rows so the file does not grow forever
+            if random.random() < 0.01:
+                conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+        except Exception as e:
+            print(f"⚠️ Shared cache write failed for {namespace}:{key}: {e}")
+
+    def acquire_lock(self, name: str, ttl: float = LOCK_TTL) -> bool:
+        """Try once to take a cross-process lock; expired locks are taken over"""
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM locks WHERE name = ? AND expires_at <= ?', (name, now))
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)',
+                    (name, self.owner, now + ttl)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            return cursor.rowcount == 1
+        except Exception as e:
+            print(f"⚠️ Shared cache lock failed for {name}: {e}")
+            # Without a working lock every worker refreshes on its own
+            return True
+
+    def release_lock(self, name: str):
+        try:
+            self._connection().execute('DELETE FROM locks WHERE name = ? AND owner = ?', (name, self.owner))
+        except Exception as e:
+            print(f"⚠️ Shared cache unlock failed for {name}: {e}")
+
+    def is_locked(self, name: str) -> bool:
+        try:
+            row = self._connection().execute(
+                'SELECT 1 FROM locks WHERE name = ? AND expires_at > ?', (name, time.time())
+            ).fetchone()
+            return row is not None
+        except Exception as e:
+            print(f"⚠️ Shared cache lock check failed for {name}: {e}")
+            return False
+
+    async def async_wait_for_unlock(self, name: str, timeout: float = LOCK_TTL):
+        deadline = time.monotonic() + timeout
+        while self.is_locked(name) and time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    async def get_or_refresh(self, namespace: str, key: str, ttl: float,
+                             refresh: Callable[[], Awaitable[Any]],
+                             negative_ttl: Optional[float] = None) -> Any:
+        """Return the cached value, or let exactly one worker compute it while the rest wait
+
+        None is never cached. Other empty values are cached for negative_ttl
+        when given, otherwise they are treated like None.
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        lock_name = f"{namespace}:{key}"
+        if not self.acquire_lock(lock_name):
+            await self.async_wait_for_unlock(lock_name)
+            value = self.get(namespace, key)
+            if value is not None:
+                return value
+            # The other worker failed or timed out - refresh ourselves
+            return await refresh()
+
+        try:
+            value = await refresh()
+            if value:
+                self.set(namespace, key, value, ttl)
+            elif value is not None and negative_ttl:
+                self.set(namespace, key, value, negative_ttl)
+            return value
+        finally:
+            self.release_lock(lock_name)
+
+
+shared_cache = SharedCache()
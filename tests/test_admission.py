@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, Overloaded
+
+
+def wait_for_queue(controller, depth, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while controller.queue_depth != depth and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert controller.queue_depth == depth
+
+
+def start_waiter(controller, client, order, results):
+    def run():
+        try:
+            controller.acquire(client)
+            order.append(client)
+            results[client] = 'admitted'
+        except Overloaded as e:
+            results[client] = e.reason
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_admits_immediately_under_limit():
+    controller = AdmissionController(max_concurrent=2, max_queue=2, per_client=2, latency_slo=5)
+    controller.acquire('a')
+    controller.acquire('b')
+    assert controller.stats()['active'] == 2
+    assert controller.stats()['admitted'] == 2
+    assert controller.stats()['pid'] == os.getpid()
+
+
+def test_queue_is_fifo_for_a_single_client():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, per_client=3, latency_slo=5)
+    controller.service_time = 0.1
+    controller.acquire('a')
+    order, results = [], {}
+    first = start_waiter(controller, 'a', order, results)
+    wait_for_queue(controller, 1)
+    waiter = controller.waiting['a'][0]
+
+    second = threading.Thread(target=controller.acquire, args=('a',))
+    second.start()
+    wait_for_queue(controller, 2)
+
+    controller.release('a', 0.1)
+    first.join(timeout=2)
+    assert waiter.granted
+    assert controller.queue_depth == 1
+    controller.release('a', 0.1)
+    second.join(timeout=2)
+    assert controller.queue_depth == 0
+
+
+def test_free_slots_go_round_robin_across_clients():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, per_client=3, latency_slo=5)
+    controller.service_time = 0.1
+    controller.acquire('a')
+    order, results = [], {}
+    threads = []
+    for client in ('a', 'a', 'b'):
+        threads.append(start_waiter(controller, client, order, results))
+        wait_for_queue(controller, len(threads))
+
+    # 'a' queued twice before 'b', but 'b' gets the second free slot
+    for released, expected in (('a', 1), ('a', 2), ('b', 3)):
+        controller.release(released, 0.1)
+        deadline = time.monotonic() + 2
+        while len(order) < expected and time.monotonic() < deadline:
+            time.sleep(0.005)
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ['a', 'b', 'a']
+
+
+def test_timed_out_waiter_is_removed_from_queue():
+    controller = AdmissionController(max_concurrent=1, max_queue=2, per_client=2, latency_slo=0.1)
+    controller.service_time = 0.01
+    controller.acquire('a')
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire('b')
+    assert excinfo.value.reason == 'timeout'
+    assert controller.queue_depth == 0
+    assert 'b' not in controller.waiting
+    # The abandoned waiter must not take the slot when it frees up
+    controller.release('a', 0.01)
+    assert controller.active == 0
+
+
+def test_sheds_when_client_over_its_share():
+    controller = AdmissionController(max_concurrent=4, max_queue=4, per_client=1, latency_slo=5)
+    controller.acquire('a')
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire('a')
+    assert excinfo.value.reason == 'client_limit'
+    assert controller.stats()['shed'] == {'client_limit': 1}
+
+
+def test_sheds_when_queue_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, per_client=2, latency_slo=5)
+    controller.acquire('a')
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire('b')
+    assert excinfo.value.reason == 'queue_full'
+    assert excinfo.value.retry_after >= 1
+
+
+def test_sheds_when_predicted_wait_exceeds_slo():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, per_client=2, latency_slo=5)
+    controller.service_time = 10
+    controller.acquire('a')
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire('b')
+    assert excinfo.value.reason == 'slo'
+    assert excinfo.value.retry_after == 10
+    assert controller.queue_depth == 0
+
+
+def test_admit_releases_slot_and_tracks_service_time():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, per_client=1, latency_slo=5)
+    with controller.admit('a'):
+        assert controller.active == 1
+    assert controller.active == 0
+    assert controller.active_per_client == {}
+    assert controller.service_time < 10
@@ -0,0 +1,86 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_scraper import FeedState, RobustArticleScraper
+
+
+def make_feed(*items):
+    """RSS body with (guid, title, pubDate) items, newest first"""
+    body = ''.join(
+        f"<item><guid>{guid}</guid><title>{title}</title><link>https://example.com/{guid}</link>"
+        f"<description>{title}</description><pubDate>{published}</pubDate></item>"
+        for guid, title, published in items
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Test Feed</title>{body}</channel></rss>'
+
+
+def poll(state, content):
+    new_entries = RobustArticleScraper.parse_new_entries(state, content)
+    state.add_entries(new_entries)
+    return [record['id'] for record in new_entries]
+
+
+def record(entry_id, minute, title='ai news'):
+    return {
+        'id': entry_id,
+        'published': (2024, 1, 1, 10, minute, 0, 0, 1, 0),
+        'title': title,
+        'title_lower': title.lower(),
+        'url': f"https://example.com/{entry_id}",
+        'source': 'Test Feed',
+        'description': title.lower()
+    }
+
+
+def test_repeat_poll_only_returns_new_entries():
+    state = FeedState()
+    first = make_feed(('a', 'AI one', 'Mon, 01 Jan 2024 10:00:00 GMT'))
+    assert poll(state, first) == ['a']
+    assert poll(state, first) == []
+    second = make_feed(('b', 'AI two', 'Mon, 01 Jan 2024 10:05:00 GMT'),
+                       ('a', 'AI one', 'Mon, 01 Jan 2024 10:00:00 GMT'))
+    assert poll(state, second) == ['b']
+
+
+def test_same_minute_and_out_of_order_guids_are_kept():
+    state = FeedState()
+    poll(state, make_feed(('a', 'AI one', 'Mon, 01 Jan 2024 10:00:00 GMT')))
+    # Same timestamp as the newest seen entry, and one published earlier but added late
+    late = make_feed(('b', 'AI two', 'Mon, 01 Jan 2024 10:00:00 GMT'),
+                     ('c', 'AI three', 'Mon, 01 Jan 2024 09:59:00 GMT'),
+                     ('a', 'AI one', 'Mon, 01 Jan 2024 10:00:00 GMT'))
+    assert poll(state, late) == ['b', 'c']
+
+
+def test_evicted_guids_fall_back_to_the_eviction_watermark():
+    state = FeedState()
+    state.MAX_SEEN = 3
+    state.add_entries([record(guid, minute) for guid, minute in (('d', 4), ('c', 3), ('b', 2), ('a', 1))])
+    # 'a' was evicted from the seen-set, but is no newer than the watermark
+    assert 'a' not in state.seen_ids
+    assert state.evicted_published == record('a', 1)['published']
+    assert not state.is_new('a', record('a', 1)['published'])
+    assert not state.is_new('b', record('b', 2)['published'])
+    # Unseen GUIDs newer than anything evicted are still new, even if older than the newest entry
+    assert state.is_new('x', record('x', 2)['published'])
+    assert state.is_new('y', None)
+
+
+def test_cached_matches_are_extended_across_polls():
+    state = FeedState()
+    state.add_entries([record('b', 2, 'Sports'), record('a', 1, 'AI one')])
+    assert [match['id'] for match in state.get_matches(['ai'])] == ['a']
+    state.add_entries([record('e', 5, 'Weather'), record('d', 4, 'AI three'), record('c', 3, 'AI two')])
+    assert [match['id'] for match in state.get_matches(['ai'])] == ['d', 'c', 'a']
+    # A keyword set first seen now is built from every entry parsed so far
+    assert [match['id'] for match in state.get_matches(['sports', 'weather'])] == ['e', 'b']
+
+
+def test_match_sets_are_bounded():
+    state = FeedState()
+    state.add_entries([record('a', 1)])
+    for i in range(FeedState.MAX_MATCH_SETS + 5):
+        state.get_matches([f"keyword{i}"])
+    assert len(state.matches) == FeedState.MAX_MATCH_SETS
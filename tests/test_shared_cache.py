@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_cache import SharedCache
+
+
+@pytest.fixture
+def caches(tmp_path):
+    """Two caches on one database, standing in for two worker processes"""
+    path = str(tmp_path / 'cache.db')
+    return SharedCache(path), SharedCache(path)
+
+
+def counting_refresh(calls, value, delay=0.0):
+    async def refresh():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+    return refresh
+
+
+def test_values_are_visible_across_instances(caches):
+    first, second = caches
+    first.set('content', 'url', {'text': 'hello'}, ttl=60)
+    assert second.get('content', 'url') == {'text': 'hello'}
+    first.set('content', 'stale', 'old', ttl=-1)
+    assert second.get('content', 'stale') is None
+
+
+def test_lock_is_exclusive_and_expires(caches):
+    first, second = caches
+    assert first.acquire_lock('feed', ttl=0.2)
+    assert not second.acquire_lock('feed')
+    assert second.is_locked('feed')
+    # Only the owner can release it
+    second.release_lock('feed')
+    assert first.is_locked('feed')
+    time.sleep(0.25)
+    assert second.acquire_lock('feed')
+
+
+def test_one_refresh_per_key_across_instances(caches):
+    first, second = caches
+    calls = []
+
+    async def run():
+        return await asyncio.gather(
+            first.get_or_refresh('content', 'a', 60, counting_refresh(calls, 'A', delay=0.3)),
+            second.get_or_refresh('content', 'a', 60, counting_refresh(calls, 'A', delay=0.3)),
+            second.get_or_refresh('content', 'b', 60, counting_refresh(calls, 'B'))
+        )
+
+    assert asyncio.run(run()) == ['A', 'A', 'B']
+    assert sorted(calls) == ['A', 'B']
+    assert not first.is_locked('content:a')
+
+
+def test_waiting_for_a_lock_does_not_block_the_loop(caches):
+    first, second = caches
+    assert first.acquire_lock('verdicts', ttl=0.3)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(second.async_wait_for_unlock('verdicts', timeout=1), ticker())
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert len(ticks) == 5
+    assert ticks[-1] - start < 0.25
+    assert time.monotonic() - start >= 0.25
+
+
+def test_negative_results_expire_after_negative_ttl(caches):
+    first, second = caches
+    calls = []
+    refresh = counting_refresh(calls, '')
+
+    assert asyncio.run(first.get_or_refresh('content', 'img', 60, refresh, negative_ttl=0.2)) == ''
+    assert asyncio.run(second.get_or_refresh('content', 'img', 60, refresh, negative_ttl=0.2)) == ''
+    assert len(calls) == 1
+    time.sleep(0.25)
+    asyncio.run(second.get_or_refresh('content', 'img', 60, refresh, negative_ttl=0.2))
+    assert len(calls) == 2
+
+
+def test_empty_and_none_results_are_not_cached_without_negative_ttl(caches):
+    first, _ = caches
+    calls = []
+    asyncio.run(first.get_or_refresh('content', 'x', 60, counting_refresh(calls, '')))
+    asyncio.run(first.get_or_refresh('content', 'x', 60, counting_refresh(calls, '')))
+    # None marks a transient failure and is never cached, even with a negative TTL
+    asyncio.run(first.get_or_refresh('content', 'y', 60, counting_refresh(calls, None), negative_ttl=60))
+    asyncio.run(first.get_or_refresh('content', 'y', 60, counting_refresh(calls, None), negative_ttl=60))
+    assert len(calls) == 4
+    assert first.get('content', 'x') is None
+    assert first.get('content', 'y') is None
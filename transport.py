@@ -0,0 +1,140 @@
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import aiohttp
+import httpx
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+HTTP_TRANSPORT = os.getenv('HTTP_TRANSPORT', 'aiohttp')
+
+
+class AiohttpResponse:
+    """Passes through to an aiohttp response, adding the capped read the scrapers need"""
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def read_limited(self, limit: int) -> bytes:
+        """Read at most limit bytes of the body, however it is framed"""
+        body = bytearray()
+        while len(body) < limit:
+            chunk = await self._response.content.read(limit - len(body))
+            if not chunk:
+                break
+            body.extend(chunk)
+        return bytes(body)
+
+
+class AiohttpTransport:
+    """HTTP/1.1 transport backed by a pooled aiohttp.ClientSession"""
+
+    name = 'aiohttp'
+
+    def __init__(self, headers: Optional[Dict] = None, limit: int = 100, limit_per_host: int = 30):
+        # Create session with minimal configuration to avoid proxy issues
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+        timeout = aiohttp.ClientTimeout(total=30, connect=10)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=headers or DEFAULT_HEADERS
+        )
+
+    @asynccontextmanager
+    async def get(self, url: str, headers: Optional[Dict] = None, timeout: Optional[float] = None):
+        kwargs = {'headers': headers}
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self.session.get(url, **kwargs) as response:
+            yield AiohttpResponse(response)
+
+    async def close(self):
+        await self.session.close()
+
+
+class HttpxResponse:
+    """Adapts a streamed httpx.Response to the aiohttp response interface"""
+
+    def __init__(self, response: httpx.Response):
+        self._response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.http_version = response.http_version
+
+    @property
+    def content_length(self) -> Optional[int]:
+        length = self.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+
+    @property
+    def charset(self) -> Optional[str]:
+        return self._response.charset_encoding
+
+    async def read(self) -> bytes:
+        return await self._response.aread()
+
+    async def read_limited(self, limit: int) -> bytes:
+        """Read at most limit bytes of the body, however it is framed"""
+        body = bytearray()
+        async for chunk in self._response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) >= limit:
+                break
+        return bytes(body[:limit])
+
+    async def text(self) -> str:
+        await self._response.aread()
+        return self._response.text
+
+    async def json(self):
+        return json.loads(await self.read())
+
+
+class HttpxTransport:
+    """HTTP/2 transport backed by httpx, multiplexing requests to the same host over one connection"""
+
+    name = 'httpx'
+
+    def __init__(self, headers: Optional[Dict] = None, limit: int = 100, limit_per_host: int = 30,
+                 http1: bool = True, http2: bool = True):
+        # httpx has no per-host limit; HTTP/2 streams share one connection per host anyway
+        self.client = httpx.AsyncClient(
+            http1=http1,
+            http2=http2,
+            headers=headers or DEFAULT_HEADERS,
+            timeout=httpx.Timeout(30, connect=10),
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit_per_host),
+            follow_redirects=True
+        )
+
+    @asynccontextmanager
+    async def get(self, url: str, headers: Optional[Dict] = None, timeout: Optional[float] = None):
+        kwargs = {'headers': headers}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        # Stream so callers can inspect headers before the body is downloaded
+        async with self.client.stream('GET', url, **kwargs) as response:
+            yield HttpxResponse(response)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+TRANSPORTS = {
+    'aiohttp': AiohttpTransport,
+    'httpx': HttpxTransport
+}
+
+
+def create_transport(name: Optional[str] = None, **kwargs):
+    name = name or HTTP_TRANSPORT
+    if name not in TRANSPORTS:
+        print(f"⚠️ Unknown HTTP transport '{name}', falling back to aiohttp")
+        name = 'aiohttp'
+    return TRANSPORTS[name](**kwargs)